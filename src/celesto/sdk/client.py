@@ -1,13 +1,16 @@
+import io
 import json
 import os
+import stat
 import sys
 import tarfile
 import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List, Literal, Optional
+from typing import Any, BinaryIO, Iterable, Iterator, List, Literal, Optional
 
 import httpx
-import pathspec
 
 from .exceptions import (
     CelestoAuthenticationError,
@@ -17,9 +20,100 @@ from .exceptions import (
     CelestoServerError,
     CelestoValidationError,
 )
+from .ignore import IgnoreSpec, _compile_ignore_file
 
 _BASE_URL = os.environ.get("CELESTO_BASE_URL", "https://api.celesto.ai/v1")
 
+# Fastest gzip level; bundles are mostly source code, where higher levels
+# cost several times the CPU for a few percent smaller uploads.
+_BUNDLE_COMPRESSLEVEL = 1
+
+# Files are read by a thread pool while the calling thread compresses. Files
+# above the size limit are streamed from disk instead to bound memory use.
+_BUNDLE_READ_WORKERS = 8
+_BUNDLE_READ_AHEAD = 4 * _BUNDLE_READ_WORKERS
+_BUNDLE_READ_AHEAD_MAX_SIZE = 4 * 1024 * 1024
+
+# Bundles up to this size never touch the disk
+_BUNDLE_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+
+def _read_bundle_file(
+    entry: os.DirEntry, arcname: str
+) -> tuple[tarfile.TarInfo | None, bytes | None]:
+    """Stat and read one file for ``_write_bundle``.
+
+    The stat comes from the directory entry, which caches it (and on Windows
+    gets it from the listing for free). ``TarFile.add`` would stat the path
+    again and resolve owner and group names, which a bundle doesn't need.
+
+    Returns:
+        The member header and file contents. Contents are None for symlinks
+        and for files too large to read ahead. Both are None for special
+        files and hard-linked files, which are left to ``TarFile.add``.
+    """
+    st = entry.stat(follow_symlinks=False)
+    info = tarfile.TarInfo(arcname)
+    info.mtime = int(st.st_mtime)
+    info.mode = stat.S_IMODE(st.st_mode)
+    if stat.S_ISLNK(st.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = os.readlink(entry.path)
+        return info, None
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink > 1:
+        # TarFile.add tracks inodes, so repeated hard links are stored as
+        # LNKTYPE entries instead of full copies
+        return None, None
+
+    info.size = st.st_size
+    if st.st_size > _BUNDLE_READ_AHEAD_MAX_SIZE:
+        return info, None
+    with open(entry.path, "rb") as f:
+        data = f.read()
+    # The file may have changed size since it was stat'ed
+    info.size = len(data)
+    return info, data
+
+
+def _write_bundle_entry(
+    tar: tarfile.TarFile, entry: os.DirEntry, arcname: str, read: Future
+) -> None:
+    """Write one entry read by ``_read_bundle_file`` to ``tar``."""
+    info, data = read.result()
+    if info is None:
+        tar.add(entry.path, arcname=arcname, recursive=False)
+    elif data is not None:
+        tar.addfile(info, io.BytesIO(data))
+    elif info.isreg():
+        with open(entry.path, "rb") as f:
+            tar.addfile(info, f)
+    else:
+        tar.addfile(info)
+
+
+def _write_bundle(
+    tar: tarfile.TarFile, files: Iterable[tuple[os.DirEntry, str]]
+) -> None:
+    """Add ``files`` to ``tar``, reading them ahead on worker threads.
+
+    File reads overlap with compression, which stays on the calling thread
+    since ``TarFile`` is not thread-safe. Entries are written in walk order
+    with a bounded number of reads in flight.
+
+    Args:
+        tar: Archive open for writing
+        files: Tuples of (directory entry, archive name)
+    """
+    pending: deque[tuple[os.DirEntry, str, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=_BUNDLE_READ_WORKERS) as executor:
+        for entry, arcname in files:
+            read = executor.submit(_read_bundle_file, entry, arcname)
+            pending.append((entry, arcname, read))
+            if len(pending) >= _BUNDLE_READ_AHEAD:
+                _write_bundle_entry(tar, *pending.popleft())
+        while pending:
+            _write_bundle_entry(tar, *pending.popleft())
+
 
 class _BaseConnection:
     """Base class providing connection management for Celesto API.
@@ -298,46 +392,24 @@ class Deployment(_BaseClient):
             raise CelestoValidationError("First project missing id in response.")
         return project_id
 
-    def _load_ignore_patterns(self, folder: Path) -> pathspec.PathSpec | None:
+    def _load_ignore_patterns(self, folder: Path) -> IgnoreSpec | None:
         """Load ignore patterns from .celestoignore file if it exists.
 
         Args:
             folder: The folder to search for .celestoignore
 
         Returns:
-            PathSpec object if .celestoignore exists, None otherwise
+            IgnoreSpec object if .celestoignore exists, None otherwise
         """
         ignore_file = folder / ".celestoignore"
         if not ignore_file.exists():
             return None
 
         try:
-            with open(ignore_file, "r", encoding="utf-8") as f:
-                patterns = f.read().splitlines()
-
-            # Process patterns according to gitignore spec:
-            # 1. Lines starting with # (after whitespace) are comments
-            # 2. Inline comments: # preceded by space (e.g., "pattern # comment")
-            # 3. # without preceding space is literal (e.g., "file#name")
-            processed_patterns = []
-            for line in patterns:
-                # Strip inline comments: only ' #' (space followed by #) starts a comment
-                # Find the first occurrence of ' #' pattern
-                space_hash_idx = line.find(" #")
-                if space_hash_idx >= 0:
-                    # Strip from the space before # onwards
-                    line = line[:space_hash_idx]
-
-                # Strip leading/trailing whitespace
-                line = line.strip()
-
-                # Skip empty lines and full-line comments (lines starting with #)
-                if not line or line.startswith("#"):
-                    continue
-
-                processed_patterns.append(line)
-
-            return pathspec.PathSpec.from_lines("gitignore", processed_patterns)
+            file_stat = ignore_file.stat()
+            return _compile_ignore_file(
+                str(ignore_file), file_stat.st_mtime_ns, file_stat.st_size
+            )
         except OSError as e:
             print(f"Warning: Failed to read .celestoignore file: {e}", file=sys.stderr)
             print("Continuing deployment without file filtering.", file=sys.stderr)
@@ -350,18 +422,74 @@ class Deployment(_BaseClient):
             print("Continuing deployment without file filtering.", file=sys.stderr)
             return None
 
+    def _iter_bundle_files(
+        self, folder: Path, ignore_spec: IgnoreSpec | None
+    ) -> Iterator[tuple[os.DirEntry, str]]:
+        """Yield the files to bundle from ``folder`` with their archive names.
+
+        Ignored directories are pruned so the walk never descends into them,
+        which saves matching and stat calls for every file below.
+
+        Args:
+            folder: The folder being deployed
+            ignore_spec: Patterns loaded from .celestoignore, if any
+
+        Yields:
+            Tuples of (directory entry, POSIX-style archive name)
+        """
+        # Directories still to be walked, with their archive name prefix
+        # (e.g. "pkg/sub/"). Names are built by concatenation so no Path
+        # objects are created per file.
+        pending = [(os.fspath(folder), "")]
+        while pending:
+            path, prefix = pending.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                # Unreadable directories are skipped, as os.walk does
+                continue
+
+            # is_dir() is answered from the directory listing on most
+            # platforms, so classifying entries needs no stat calls
+            dirs = []
+            files = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                (dirs if is_dir else files).append(entry)
+
+            # Patterns are matched against forward-slash paths
+            is_ignored = ignore_spec.match_file if ignore_spec else None
+
+            # Add files that aren't ignored
+            for entry in files:
+                arcname = prefix + entry.name
+                if is_ignored is None or not is_ignored(arcname):
+                    yield entry, arcname
+
+            # Never descend into ignored directories. Like os.walk, symlinks
+            # to directories are not followed. A trailing slash is needed to
+            # apply dir-only patterns.
+            for entry in dirs:
+                rel_dir = prefix + entry.name + "/"
+                if entry.is_symlink() or (
+                    is_ignored is not None and is_ignored(rel_dir)
+                ):
+                    continue
+                pending.append((entry.path, rel_dir))
+
     def _create_deployment(
         self,
-        bundle: Path,
+        bundle: BinaryIO,
         name: str,
         description: str,
         envs: dict[str, str],
         project_id: str,
     ) -> dict:
         """Internal method to upload and create a deployment."""
-        if bundle.exists() and not bundle.is_file():
-            raise CelestoValidationError(f"Bundle {bundle} is not a file")
-
         # multi part form data where bundle is the file upload
         config = {"env": envs or {}}
 
@@ -374,9 +502,10 @@ class Deployment(_BaseClient):
         }
 
         # Multipart form data with file upload
-        with open(bundle, "rb") as f:
-            files = {"code_bundle": ("app_bundle.tar.gz", f.read(), "application/gzip")}
-            return self._request("POST", "/deploy/agent", files=files, data=form_data)
+        files = {
+            "code_bundle": ("app_bundle.tar.gz", bundle.read(), "application/gzip")
+        }
+        return self._request("POST", "/deploy/agent", files=files, data=form_data)
 
     def deploy(
         self,
@@ -433,52 +562,20 @@ class Deployment(_BaseClient):
         # Load ignore patterns from .celestoignore if it exists
         ignore_spec = self._load_ignore_patterns(folder)
 
-        # Create tar.gz archive (Nixpacks expects tar.gz format)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".tar.gz") as temp_file:
-            with tarfile.open(temp_file.name, "w:gz") as tar:
+        # Create tar.gz archive (Nixpacks expects tar.gz format). Bundles are
+        # built in memory and only spill to a temporary file once they grow
+        # past _BUNDLE_SPOOL_MAX_SIZE.
+        with tempfile.SpooledTemporaryFile(max_size=_BUNDLE_SPOOL_MAX_SIZE) as bundle:
+            with tarfile.open(
+                fileobj=bundle, mode="w:gz", compresslevel=_BUNDLE_COMPRESSLEVEL
+            ) as tar:
                 # Recursively add all files, respecting .celestoignore patterns
-                for root, dirs, files in os.walk(folder):
-                    root_path = Path(root)
-                    rel_root = root_path.relative_to(folder)
-
-                    # Filter directories in-place to avoid descending into ignored dirs
-                    if ignore_spec:
-                        # Check each directory and remove ignored ones
-                        dirs_to_remove = []
-                        for d in dirs:
-                            rel_dir = rel_root / d if rel_root != Path(".") else Path(d)
-                            # PathSpec needs forward slashes and trailing slash for dirs
-                            dir_pattern = str(rel_dir).replace("\\", "/") + "/"
-                            if ignore_spec.match_file(dir_pattern):
-                                dirs_to_remove.append(d)
-                        for d in dirs_to_remove:
-                            dirs.remove(d)
-
-                    # Add files that aren't ignored
-                    for file in files:
-                        file_path = root_path / file
-                        rel_file = (
-                            rel_root / file if rel_root != Path(".") else Path(file)
-                        )
+                _write_bundle(tar, self._iter_bundle_files(folder, ignore_spec))
+            bundle.seek(0)
 
-                        # Skip if file matches ignore patterns
-                        if ignore_spec:
-                            # PathSpec needs forward slashes
-                            file_pattern = str(rel_file).replace("\\", "/")
-                            if ignore_spec.match_file(file_pattern):
-                                continue
-
-                        # Add file to archive with relative path
-                        arcname = str(rel_file).replace("\\", "/")
-                        tar.add(file_path, arcname=arcname)
-            bundle = Path(temp_file.name)
-
-        try:
             return self._create_deployment(
                 bundle, name, description, envs, resolved_project_id
             )
-        finally:
-            bundle.unlink()
 
     def list(self) -> List[dict]:
         """List all deployments for your account.
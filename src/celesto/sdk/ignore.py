@@ -0,0 +1,314 @@
+"""
+.celestoignore parsing and matching.
+
+Patterns follow the gitignore specification. Each line is translated to a
+regex by ``pathspec`` and the results are fused into a single alternation,
+so matching a path costs one regex match regardless of how many patterns
+the file contains. When the optional ``google-re2`` package is installed
+(``pip install celesto[re2]``) the regex is compiled with RE2, whose
+linear-time matching rules out catastrophic backtracking on user-written
+patterns.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import pathspec
+
+try:
+    import re2
+except ImportError:  # pragma: no cover - depends on optional extra
+    re2 = None
+
+_MATCH_CACHE_MAX_SIZE = 10000
+
+# RE2's default 8 MiB budget runs the DFA out of memory on a few thousand
+# fused patterns, after which it logs to stderr on every match
+_RE2_MAX_MEM = 64 << 20
+
+# Patterns per regex when locating the pattern that decided a match
+_WINNER_CHUNK_SIZE = 64
+
+# Translations persisted across processes, see _compile_ignore_file()
+_IGNORE_CACHE_FORMAT = 2
+_IGNORE_CACHE_MAX_ENTRIES = 256
+
+# pathspec marks directory separators with named groups (e.g. ``(?P<ps_d>/)``),
+# which would clash once several patterns share one regex.
+_NAMED_GROUP_RE = re.compile(r"\(\?P<\w+>")
+
+# Captures the pattern on each line according to the gitignore spec:
+# 1. Leading and trailing whitespace is stripped
+# 2. Inline comments: ' #' (space followed by #) starts a comment
+# 3. # without preceding space is literal (e.g., "file#name")
+# Full-line comments come out starting with # and are dropped by the caller.
+_IGNORE_LINE_RE = re.compile(r"^[^\S\n]*(.*?)[^\S\n]*(?: #.*)?$", re.MULTILINE)
+
+# A plain name with no glob magic or inner slash, optionally marked as a
+# directory with a trailing slash (e.g. ".env" or "node_modules/").
+_LITERAL_PATTERN_RE = re.compile(r"([^*?\[\\!/]+)(/?)")
+
+
+def _parse_ignore_lines(text: str) -> tuple[str, ...]:
+    """Return the patterns in a .celestoignore file, without comments or blanks."""
+    return tuple(
+        line
+        for line in _IGNORE_LINE_RE.findall(text)
+        if line and not line.startswith("#")
+    )
+
+
+def _compile_regex(source: str):
+    """Compile ``source`` with RE2 when available, falling back to ``re``."""
+    if re2 is not None:
+        options = re2.Options()
+        options.log_errors = False
+        options.max_mem = _RE2_MAX_MEM
+        try:
+            return re2.compile(source, options)
+        except re2.error:
+            # Constructs RE2 doesn't support, or programs over its memory
+            # budget, still work with the stdlib engine
+            pass
+    return re.compile(source)
+
+
+def _compile_alternation(branches: list[str]):
+    """Compile ``branches`` into one alternation without capturing groups."""
+    return _compile_regex("|".join(f"(?:{branch})" for branch in branches))
+
+
+def _translate_patterns(patterns: tuple[str, ...]) -> dict[str, Any]:
+    """Translate pattern lines into the pieces ``IgnoreSpec`` matches with.
+
+    The result only holds plain strings, booleans and lists so it can be
+    persisted as JSON.
+    """
+    # Literal names may only bypass the regex when no later negation
+    # could override them
+    use_literals = not any(line.startswith("!") for line in patterns)
+    literal_names = []
+    literal_dirs = []
+
+    pattern_cls = pathspec.util.lookup_pattern("gitignore")
+    branches = []
+    includes = []
+    for line in reversed(patterns):
+        literal = _LITERAL_PATTERN_RE.fullmatch(line) if use_literals else None
+        if literal is not None and literal.group(1) not in (".", ".."):
+            name, is_dir = literal.groups()
+            (literal_dirs if is_dir else literal_names).append(name)
+            continue
+
+        pattern = pattern_cls(line)
+        if pattern.include is None:
+            continue
+        source = _NAMED_GROUP_RE.sub("(?:", pattern.regex.pattern)
+        if not source.startswith("^"):
+            # pathspec searches anywhere in the path; anchor so the
+            # alternation order still decides precedence
+            source = f"(?s:.*?){source}"
+        branches.append(source)
+        includes.append(pattern.include)
+
+    return {
+        "branches": branches,
+        "includes": includes,
+        "literal_names": literal_names,
+        "literal_dirs": literal_dirs,
+    }
+
+
+class IgnoreSpec:
+    """Compiled set of gitignore-style patterns.
+
+    As in git, the last pattern matching a path decides whether it is
+    ignored, so a later ``!pattern`` re-includes files excluded earlier.
+    The patterns are fused in reverse order, which makes the first
+    alternative that matches the winning pattern. A group-free alternation
+    decides whether any pattern matches; only specs with negations then
+    look up which one did. Without negations the order does not matter, so
+    plain names like ``.env`` or ``node_modules/`` are checked with set
+    lookups on the path components instead.
+
+    Args:
+        patterns: Pattern lines with comments and blank lines removed.
+        translation: Output of ``_translate_patterns`` for ``patterns``, when
+            already known (e.g. loaded from the on-disk cache).
+
+    Example:
+        spec = IgnoreSpec(["*.log", "!important.log"])
+        spec.match_file("debug.log")      # True
+        spec.match_file("important.log")  # False
+    """
+
+    def __init__(
+        self, patterns: Iterable[str], translation: dict[str, Any] | None = None
+    ):
+        self.patterns = tuple(patterns)
+        if translation is None:
+            translation = _translate_patterns(self.patterns)
+        self._translation = translation
+
+        self._literal_names = set(translation["literal_names"])
+        self._literal_dirs = set(translation["literal_dirs"])
+        branches = translation["branches"]
+        self._includes: list[bool] = translation["includes"]
+        self._regex = _compile_alternation(branches) if branches else None
+
+        # Only negations make it matter which pattern matched. Finding it
+        # needs a capturing group per pattern, which gets quadratically
+        # slower with the pattern count, so groups are confined to chunks.
+        self._chunks = []
+        if not all(self._includes):
+            for start in range(0, len(branches), _WINNER_CHUNK_SIZE):
+                chunk = branches[start : start + _WINNER_CHUNK_SIZE]
+                named = "|".join(f"(?P<p{i}>{b})" for i, b in enumerate(chunk))
+                self._chunks.append(
+                    (start, _compile_alternation(chunk), _compile_regex(named))
+                )
+        self._match_cache: dict[str, bool] = {}
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def match_file(self, file: str) -> bool:
+        """Return whether ``file`` is ignored.
+
+        Directories must end with ``/`` for dir-only patterns like
+        ``build/`` to apply to them.
+        """
+        result = self._match_cache.get(file)
+        if result is None:
+            result = False
+            norm_file = pathspec.util.normalize_file(file)
+            if self._literal_names or self._literal_dirs:
+                # A name pattern matches any component; a dir pattern only
+                # components followed by a slash
+                parts = norm_file.split("/")
+                result = not (
+                    self._literal_names.isdisjoint(parts)
+                    and self._literal_dirs.isdisjoint(parts[:-1])
+                )
+            if not result and self._regex is not None:
+                if self._regex.match(norm_file) is not None:
+                    result = (
+                        not self._chunks
+                        or self._includes[self._winning_pattern(norm_file)]
+                    )
+            # Start over rather than tracking recency once the cache is full
+            if len(self._match_cache) >= _MATCH_CACHE_MAX_SIZE:
+                self._match_cache.clear()
+            self._match_cache[file] = result
+        return result
+
+    def _winning_pattern(self, norm_file: str) -> int:
+        """Return the index of the first branch matching ``norm_file``.
+
+        Branches are in reverse declaration order, so this is the last
+        matching pattern. Only called once the fused regex has matched.
+        """
+        for start, any_regex, named_regex in self._chunks:
+            if any_regex.match(norm_file) is not None:
+                match = named_regex.match(norm_file)
+                return start + int(match.lastgroup[1:])
+        raise AssertionError(f"no pattern matched {norm_file!r}")
+
+    def match_files(self, files: Iterable[str]) -> Iterator[str]:
+        """Yield the entries of ``files`` that are ignored."""
+        match_file = self.match_file
+        for file in files:
+            if match_file(file):
+                yield file
+
+
+def _ignore_cache_dir() -> Path:
+    """Return the directory holding persisted .celestoignore translations."""
+    cache_home = os.environ.get("CELESTO_CACHE_DIR")
+    if not cache_home:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+        base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+        cache_home = base / "celesto"
+    return Path(cache_home) / "ignorecache"
+
+
+def _ignore_cache_key(text: str) -> str:
+    """Hash a .celestoignore file's contents into its cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    # The translation depends on pathspec's output, so versions don't share entries
+    digest.update(f"{_IGNORE_CACHE_FORMAT}:{pathspec.__version__}:".encode())
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_cached_spec(cache_file: Path) -> IgnoreSpec | None:
+    """Return the spec persisted in ``cache_file``, or None on any miss."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        spec = IgnoreSpec(cached["patterns"], cached["translation"])
+        # Refresh the mtime, which eviction uses as the last-used time
+        os.utime(cache_file)
+        return spec
+    except (OSError, ValueError, KeyError, TypeError, re.error):
+        return None
+
+
+def _store_cached_spec(cache_file: Path, spec: IgnoreSpec) -> None:
+    """Persist ``spec`` to ``cache_file`` and evict the least recently used entries.
+
+    Caching is best effort: a read-only or full disk only costs the speedup.
+    """
+    cache_dir = cache_file.parent
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_dir / f"{cache_file.stem}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"patterns": spec.patterns, "translation": spec._translation}, f
+                )
+            os.replace(temp_file, cache_file)
+        finally:
+            # Only left behind if the write or rename failed partway
+            temp_file.unlink(missing_ok=True)
+
+        entries = sorted(cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for stale in entries[:-_IGNORE_CACHE_MAX_ENTRIES]:
+            stale.unlink()
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_ignore_file(path: str, mtime_ns: int, size: int) -> IgnoreSpec:
+    """Parse and compile a .celestoignore file.
+
+    Cached on the file's path, mtime and size so repeated loads of an
+    unchanged file reuse the compiled spec, including its match cache.
+    Editing the file changes the key, which invalidates the entry implicitly.
+
+    Across processes, the translated patterns are persisted under
+    ``_ignore_cache_dir()`` keyed by a hash of the file's contents, so a new
+    ``celesto deploy`` skips parsing and translating an unchanged file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    try:
+        cache_file = _ignore_cache_dir() / f"{_ignore_cache_key(text)}.json"
+    except (OSError, RuntimeError, KeyError):
+        # No usable cache location (e.g. no home directory for this uid);
+        # the patterns must still apply, just without the disk cache
+        return IgnoreSpec(_parse_ignore_lines(text))
+
+    spec = _load_cached_spec(cache_file)
+    if spec is None:
+        spec = IgnoreSpec(_parse_ignore_lines(text))
+        _store_cached_spec(cache_file, spec)
+    return spec
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep persisted .celestoignore translations out of the user's cache."""
+    cache_dir = tmp_path_factory.mktemp("celesto-cache")
+    monkeypatch.setenv("CELESTO_CACHE_DIR", str(cache_dir))
+    return cache_dir
@@ -1,5 +1,6 @@
 """Tests for .celestoignore file handling during deployment."""
 
+import io
 import os
 import tarfile
 import tempfile
@@ -7,7 +8,8 @@ from pathlib import Path
 
 import pytest
 
-from celesto.sdk.client import Deployment, _BaseConnection
+from celesto.sdk.client import Deployment, _BaseConnection, _write_bundle
+from celesto.sdk.ignore import _compile_ignore_file
 
 
 class MockConnection(_BaseConnection):
@@ -204,6 +206,26 @@ def test_celestoignore_does_not_ignore_itself(deployment, tmp_path: Path):
     ), ".celestoignore should not be ignored"
 
 
+def test_celestoignore_is_bundled_like_any_other_file(deployment, tmp_path: Path):
+    """Test that the bundle walk applies patterns to .celestoignore itself."""
+    (tmp_path / "main.py").write_text("code")
+
+    (tmp_path / ".celestoignore").write_text("*.pyc\n")
+    ignore_spec = deployment._load_ignore_patterns(tmp_path)
+    arcnames = {
+        name for _, name in deployment._iter_bundle_files(tmp_path, ignore_spec)
+    }
+    assert arcnames == {".celestoignore", "main.py"}
+
+    # There is no special case: a pattern matching it excludes it, as in git
+    (tmp_path / ".celestoignore").write_text("*.pyc\n.celestoignore\n")
+    ignore_spec = deployment._load_ignore_patterns(tmp_path)
+    arcnames = {
+        name for _, name in deployment._iter_bundle_files(tmp_path, ignore_spec)
+    }
+    assert arcnames == {"main.py"}
+
+
 def test_inline_comments_are_supported(deployment, tmp_path: Path):
     """Test that inline comments (# after pattern) are properly stripped.
 
@@ -301,3 +323,147 @@ def test_all_files_ignored_creates_valid_archive(deployment, tmp_path: Path):
 
     finally:
         temp_path.unlink()
+
+
+def test_ignore_patterns_are_cached_until_file_changes(deployment, tmp_path: Path):
+    """Test that an unchanged .celestoignore reuses the compiled spec."""
+    celestoignore = tmp_path / ".celestoignore"
+    celestoignore.write_text("*.pyc\n")
+
+    first = deployment._load_ignore_patterns(tmp_path)
+    second = deployment._load_ignore_patterns(tmp_path)
+    assert first is second, "Unchanged .celestoignore should hit the cache"
+
+    # Editing the file changes its size/mtime and invalidates the cache
+    celestoignore.write_text("*.pyc\n*.log\n")
+    third = deployment._load_ignore_patterns(tmp_path)
+    assert third is not first, "Edited .celestoignore should be recompiled"
+    assert third.match_file("app.log"), "New pattern should be applied"
+
+
+def test_match_results_are_memoized_per_spec(deployment, tmp_path: Path):
+    """Test that ignore decisions are cached on the compiled spec."""
+    (tmp_path / ".celestoignore").write_text("__pycache__/\n*.pyc\n")
+
+    ignore_spec = deployment._load_ignore_patterns(tmp_path)
+    rel_paths = ["__pycache__/", "pkg/module.pyc", "pkg/module.py"]
+    ignored = list(ignore_spec.match_files(rel_paths))
+    assert ignored == ["__pycache__/", "pkg/module.pyc"]
+
+    assert ignore_spec._match_cache == {
+        "__pycache__/": True,
+        "pkg/module.pyc": True,
+        "pkg/module.py": False,
+    }
+
+    # Reloading the unchanged file reuses the spec and its cached decisions
+    reloaded = deployment._load_ignore_patterns(tmp_path)
+    assert list(reloaded.match_files(rel_paths)) == ignored
+    assert reloaded._match_cache is ignore_spec._match_cache
+
+
+def test_ignored_directories_are_pruned_from_bundle(deployment, tmp_path: Path):
+    """Test that the bundle walk never descends into ignored directories."""
+    (tmp_path / "main.py").write_text("code")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "module.py").write_text("code")
+    (tmp_path / "pkg" / "__pycache__").mkdir()
+    (tmp_path / "pkg" / "__pycache__" / "module.pyc").write_text("cache")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "keep.js").write_text("js")
+    # Symlinked directories are not followed, as with os.walk
+    (tmp_path / "pkg_link").symlink_to("pkg", target_is_directory=True)
+
+    # As in git, a negation cannot re-include a file inside an excluded directory
+    (tmp_path / ".celestoignore").write_text(
+        "__pycache__/\nnode_modules/\n!node_modules/dep/keep.js\n"
+    )
+
+    ignore_spec = deployment._load_ignore_patterns(tmp_path)
+    arcnames = sorted(
+        arcname for _, arcname in deployment._iter_bundle_files(tmp_path, ignore_spec)
+    )
+
+    assert arcnames == [".celestoignore", "main.py", "pkg/module.py"]
+
+
+def test_bundle_preserves_file_contents_and_modes(
+    deployment, tmp_path: Path, monkeypatch
+):
+    """Test that bundled files keep their contents, modes and symlinks."""
+    # Files above this size are streamed instead of read ahead
+    monkeypatch.setattr("celesto.sdk.client._BUNDLE_READ_AHEAD_MAX_SIZE", 1024)
+    (tmp_path / "data.bin").write_bytes(bytes(range(256)) * 16)
+    (tmp_path / "main.py").write_text("print('hello')")
+    (tmp_path / "run.sh").write_text("#!/bin/sh\n")
+    (tmp_path / "run.sh").chmod(0o755)
+    (tmp_path / "link.py").symlink_to("main.py")
+    (tmp_path / "a.bin").write_bytes(b"x" * 4096)
+    os.link(tmp_path / "a.bin", tmp_path / "b.bin")
+
+    bundle = tmp_path / "bundle.tar.gz"
+    files = list(deployment._iter_bundle_files(tmp_path, None))
+    with tarfile.open(bundle, "w:gz") as tar:
+        _write_bundle(tar, files)
+
+    with tarfile.open(bundle, "r:gz") as tar:
+        assert tar.getnames() == [name for _, name in files]
+        assert tar.extractfile("main.py").read() == b"print('hello')"
+        assert tar.extractfile("data.bin").read() == bytes(range(256)) * 16
+        assert tar.getmember("run.sh").mode == 0o755
+        assert tar.getmember("link.py").issym()
+        assert tar.getmember("link.py").linkname == "main.py"
+
+        # Only the first hard link carries the data
+        links = [tar.getmember(name) for name in ("a.bin", "b.bin")]
+        first, second = sorted(links, key=lambda m: m.islnk())
+        assert first.isreg() and first.size == 4096
+        assert second.islnk() and second.linkname == first.name
+
+
+def test_deploy_uploads_bundle_without_ignored_files(
+    deployment, tmp_path: Path, monkeypatch
+):
+    """Test that deploy() uploads an in-memory bundle honoring .celestoignore."""
+    (tmp_path / "main.py").write_text("print('hello')")
+    (tmp_path / "debug.log").write_text("logs")
+    (tmp_path / ".celestoignore").write_text("*.log\n")
+
+    uploads = []
+
+    def fake_request(method, path, **kwargs):
+        uploads.append(kwargs)
+        return {"id": "dep-1", "status": "BUILDING"}
+
+    monkeypatch.setattr(deployment, "_resolve_first_project_id", lambda: "proj-1")
+    monkeypatch.setattr(deployment, "_request", fake_request)
+
+    result = deployment.deploy(tmp_path, name="my-agent")
+    assert result == {"id": "dep-1", "status": "BUILDING"}
+
+    filename, content, content_type = uploads[0]["files"]["code_bundle"]
+    assert (filename, content_type) == ("app_bundle.tar.gz", "application/gzip")
+    assert uploads[0]["data"]["project_id"] == "proj-1"
+    with tarfile.open(fileobj=io.BytesIO(content), mode="r:gz") as tar:
+        assert sorted(tar.getnames()) == [".celestoignore", "main.py"]
+
+
+def test_ignore_patterns_apply_without_a_cache_directory(
+    deployment, tmp_path: Path, monkeypatch
+):
+    """Test that failing to locate the on-disk cache keeps filtering enabled."""
+
+    def no_home():
+        raise RuntimeError("Could not determine home directory.")
+
+    monkeypatch.delenv("CELESTO_CACHE_DIR", raising=False)
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setattr(Path, "home", no_home)
+    _compile_ignore_file.cache_clear()
+
+    (tmp_path / ".celestoignore").write_text(".env\n")
+    ignore_spec = deployment._load_ignore_patterns(tmp_path)
+
+    assert ignore_spec is not None, "Cache failures must not disable filtering"
+    assert ignore_spec.match_file(".env")
+    assert not ignore_spec.match_file("main.py")
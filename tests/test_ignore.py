@@ -0,0 +1,247 @@
+"""Tests for the fused-regex .celestoignore matcher."""
+
+import re
+import time
+
+import pathspec
+import pytest
+
+from celesto.sdk import ignore
+from celesto.sdk.ignore import IgnoreSpec, _compile_ignore_file, _parse_ignore_lines
+
+PATTERNS = [
+    "*.pyc",
+    "__pycache__/",
+    "/build",
+    "docs/**/*.md",
+    "logs/*",
+    "!logs/keep.log",
+    "data/",
+    "!data/",
+    "*.tmp",
+    "!important.tmp",
+    "important.tmp",
+    "[abc]x.txt",
+    "file#with#hash.txt",
+    r"\#literal",
+    "node_modules",
+]
+
+# Without negations, plain names take the literal fast path
+LITERAL_PATTERNS = [
+    ".env",
+    "node_modules/",
+    "file#with#hash.txt",
+    "*.log",
+    "/dist",
+    ".",
+]
+
+PATHS = [
+    "main.py",
+    "main.pyc",
+    "pkg/module.pyc",
+    "__pycache__/",
+    "pkg/__pycache__/mod.pyc",
+    "build",
+    "build/out.js",
+    "src/build/out.js",
+    "docs/a.md",
+    "docs/guide/intro.md",
+    "docs/guide/intro.txt",
+    "logs/app.log",
+    "logs/keep.log",
+    "data/",
+    "data/file.csv",
+    "notes.tmp",
+    "important.tmp",
+    "ax.txt",
+    "dx.txt",
+    "file#with#hash.txt",
+    "#literal",
+    "node_modules/",
+    "web/node_modules/dep/index.js",
+    "./main.pyc",
+    ".env",
+    "config/.env",
+    ".env/",
+    ".envrc",
+    "node_modules",
+    "pkg/file#with#hash.txt",
+    "app.log",
+    "dist/bundle.js",
+    "src/dist/bundle.js",
+]
+
+
+@pytest.fixture(params=["re2", "re"])
+def regex_engine(request, monkeypatch):
+    """Run a test with RE2 (when installed) and with the stdlib fallback."""
+    if request.param == "re2":
+        pytest.importorskip("re2")
+    else:
+        monkeypatch.setattr(ignore, "re2", None)
+    return request.param
+
+
+@pytest.mark.parametrize("patterns", [PATTERNS, LITERAL_PATTERNS])
+@pytest.mark.parametrize("path", PATHS)
+def test_matches_agree_with_pathspec(regex_engine, patterns: list[str], path: str):
+    """Test that IgnoreSpec gives the same answers as pathspec."""
+    expected = pathspec.PathSpec.from_lines("gitignore", patterns)
+    spec = IgnoreSpec(patterns)
+
+    assert spec.match_file(path) == expected.match_file(path)
+
+
+def test_last_matching_pattern_wins():
+    """Test that pattern order decides between excludes and negations."""
+    assert not IgnoreSpec(["*.log", "!important.log"]).match_file("important.log")
+    assert IgnoreSpec(["!important.log", "*.log"]).match_file("important.log")
+
+
+def test_empty_spec_matches_nothing():
+    """Test that a spec without patterns ignores no files."""
+    spec = IgnoreSpec(_parse_ignore_lines("# only a comment\n\n"))
+
+    assert len(spec) == 0
+    assert not spec.match_file("main.py")
+
+
+def test_matching_stays_fast_with_thousands_of_patterns(regex_engine):
+    """Test that per-path cost doesn't grow quadratically with pattern count."""
+    patterns = [f"dir{i}/**/*.ext{i}" for i in range(3000)]
+    patterns.append("!dir0/keep.ext0")
+    spec = IgnoreSpec(patterns)
+    paths = [f"src/pkg{i}/module{i}.py" for i in range(500)]
+
+    start = time.perf_counter()
+    assert not any(spec.match_file(path) for path in paths)
+    # One capturing group per pattern took several seconds here
+    assert time.perf_counter() - start < 1.0
+
+    # The first and last declared patterns still decide matches correctly
+    assert spec.match_file("dir0/a/b.ext0")
+    assert not spec.match_file("dir0/keep.ext0")
+    assert spec.match_file("dir2999/a/b.ext2999")
+
+
+def test_parse_ignore_lines_strips_comments_and_whitespace():
+    """Test comment and whitespace handling when parsing .celestoignore."""
+    text = (
+        "# full-line comment\n"
+        "   # indented comment\n"
+        "\n"
+        "*.pyc  # inline comment\n"
+        "file#with#hash.txt\n"
+        "  build/  \n"
+        "a# b #c\n"
+        "\\#literal\n"
+    )
+
+    assert _parse_ignore_lines(text) == (
+        "*.pyc",
+        "file#with#hash.txt",
+        "build/",
+        "a# b",
+        "\\#literal",
+    )
+
+
+def test_plain_names_use_literal_fast_path():
+    """Test that literal names skip the regex unless negations are present."""
+    spec = IgnoreSpec([".env", "node_modules/", "*.log"])
+    assert spec._literal_names == {".env"}
+    assert spec._literal_dirs == {"node_modules"}
+    assert spec.match_file("web/node_modules/dep/index.js")
+
+    negated = IgnoreSpec([".env", "!.env"])
+    assert not negated._literal_names
+    assert not negated.match_file(".env")
+
+
+def test_regex_engine_selection(regex_engine):
+    """Test that RE2 is used when installed and stdlib re otherwise."""
+    spec = IgnoreSpec(["*.pyc"])
+
+    assert isinstance(spec._regex, re.Pattern) == (regex_engine == "re")
+    assert spec.match_file("module.pyc")
+
+
+def test_re2_stays_quiet_on_large_specs(capfd):
+    """Test that a large spec doesn't make RE2 log to stderr on every match."""
+    pytest.importorskip("re2")
+    spec = IgnoreSpec([f"dir{i}/**/*.ext{i}" for i in range(4000)])
+
+    assert not any(spec.match_file(f"src/pkg{i}/module{i}.py") for i in range(50))
+    assert spec.match_file("dir3999/a/b.ext3999")
+    assert capfd.readouterr().err == ""
+
+
+def _compile(path):
+    """Compile ``path`` as a fresh process would, bypassing the in-memory cache."""
+    _compile_ignore_file.cache_clear()
+    st = path.stat()
+    return _compile_ignore_file(str(path), st.st_mtime_ns, st.st_size)
+
+
+def test_translations_persist_across_processes(
+    tmp_path, isolated_cache_dir, monkeypatch
+):
+    """Test that an unchanged .celestoignore is loaded from the on-disk cache."""
+    celestoignore = tmp_path / ".celestoignore"
+    celestoignore.write_text("*.log  # logs\n!keep.log\n.env\n")
+
+    spec = _compile(celestoignore)
+    assert len(list((isolated_cache_dir / "ignorecache").glob("*.json"))) == 1
+
+    def fail(patterns):
+        raise AssertionError("cached translation should be reused")
+
+    monkeypatch.setattr(ignore, "_translate_patterns", fail)
+    cached = _compile(celestoignore)
+    assert cached.patterns == spec.patterns
+    assert cached.match_file("app.log")
+    assert not cached.match_file("keep.log")
+
+
+def test_persisted_cache_evicts_least_recently_used(
+    tmp_path, isolated_cache_dir, monkeypatch
+):
+    """Test that the on-disk cache keeps only the most recent entries."""
+    monkeypatch.setattr(ignore, "_IGNORE_CACHE_MAX_ENTRIES", 2)
+    celestoignore = tmp_path / ".celestoignore"
+    for index in range(4):
+        celestoignore.write_text(f"*.tmp{index}\n")
+        _compile(celestoignore)
+
+    assert len(list((isolated_cache_dir / "ignorecache").glob("*.json"))) == 2
+
+
+def test_corrupt_cache_entry_is_recompiled(tmp_path, isolated_cache_dir):
+    """Test that an unreadable cache entry falls back to parsing the file."""
+    celestoignore = tmp_path / ".celestoignore"
+    celestoignore.write_text("*.pyc\n")
+    _compile(celestoignore)
+
+    (cache_file,) = (isolated_cache_dir / "ignorecache").glob("*.json")
+    cache_file.write_text("{not json")
+
+    assert _compile(celestoignore).match_file("module.pyc")
+
+
+def test_failed_cache_write_leaves_no_temp_file(
+    tmp_path, isolated_cache_dir, monkeypatch
+):
+    """Test that a write failing partway (e.g. a full disk) is cleaned up."""
+    celestoignore = tmp_path / ".celestoignore"
+    celestoignore.write_text("*.pyc\n")
+
+    def disk_full(obj, f):
+        f.write("{")
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(ignore.json, "dump", disk_full)
+
+    assert _compile(celestoignore).match_file("module.pyc")
+    assert list((isolated_cache_dir / "ignorecache").iterdir()) == []